@@ -1,30 +1,45 @@
+import argparse
 import os
-import yaml
-from utils import load_and_process_csv_files
+from pathlib import Path
+from yaml_cache import load_yaml
 
-# Get the directory of the current script
-current_dir = os.path.dirname(os.path.abspath(__file__))
+# Default config file, next to this script
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / 'configs' / 'preprocessing_config.yaml'
 
-# Build the full path to the config file
-config_path = os.path.join(current_dir, 'configs', 'preprocessing_config.yaml')
+if __name__ == "__main__":
 
-# Load configuration from 'preprocessing.yaml'
-with open(config_path, 'r') as config_file:
-    config = yaml.safe_load(config_file)
+    parser = argparse.ArgumentParser(description="Combine the raw CSV exports into a single dataset.")
+    parser.add_argument(
+        '--config',
+        default=str(DEFAULT_CONFIG_PATH),
+        help="Path to the preprocessing config file (default: configs/preprocessing_config.yaml)"
+    )
+    args = parser.parse_args()
 
-try:
-    print(os.listdir('/'))
-    print(os.listdir('/data/'))
-    print(os.listdir('/exp/'))
-    print(os.listdir('/out/'))
-except Exception as e:
-    print(e)
+    # Load configuration from the preprocessing config file
+    config = load_yaml(args.config)
 
-input_dir = config['paths']['input_dir']
-output_path = config['paths']['output_path']
+    # List the mounted directories only when debugging the container setup
+    if os.environ.get("PIPELINE_DEBUG") == "1":
+        for path in ('/', '/data/', '/exp/', '/out/'):
+            try:
+                with os.scandir(path) as entries:
+                    print(path, [entry.name for entry in entries])
+            except OSError as e:
+                print(e)
 
-print(f"Input directory: {input_dir}")
-print(f"Output path: {output_path}")
+    input_dir = config['paths']['input_dir']
+    output_path = config['paths']['output_path']
 
-# Combine and save CSV files
-load_and_process_csv_files(input_dir, output_path)
\ No newline at end of file
+    print(f"Input directory: {input_dir}")
+    print(f"Output path: {output_path}")
+
+    # Fail fast before any CSV is read if the input directory is not mounted
+    if not os.path.isdir(input_dir):
+        raise NotADirectoryError(f"Input directory does not exist: {input_dir}")
+
+    # Imported here so that --help and a missing input directory do not pay for the pandas import
+    from utils import load_and_process_csv_files
+
+    # Combine and save CSV files
+    load_and_process_csv_files(input_dir, output_path)
@@ -1,55 +1,60 @@
+import argparse
+import functools
 import os
-from datetime import timedelta
-from processing import WorkdayProcessor
+from pathlib import Path
 
-if __name__ == "__main__":
-
-    try:
-        print(os.listdir('/'))
-        print(os.listdir('/data/'))
-        print(os.listdir('/exp/'))
-        print(os.listdir('/out/'))
-    except Exception as e:
-        print(e)
+# Default config file, next to this script
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / 'configs' / 'processing_config.yaml'
 
-    # Get the directory of the current script
-    current_dir = os.path.dirname(os.path.abspath(__file__))
 
-    # Build the full path to the config file
-    config_path = os.path.join(current_dir, 'configs', 'processing_config.yaml')
+@functools.lru_cache(maxsize=8)
+def _make_processor(config_path, mtime):
+    """
+    Builds a WorkdayProcessor for 'config_path'. Cached per (path, mtime), so repeated runs
+    in the same process reuse the processor until the config file changes.
+    """
+    from processing import WorkdayProcessor
+    return WorkdayProcessor(config_path)
 
-    print(f"Current config path: {config_path}")
-
-    # Step 1: Load configuration
-    processor = WorkdayProcessor(config_path)
 
-    # Step 2: Load the raw dataset
-    raw_df = processor.load_csv(processor.config['paths']['input_data'])
+def get_processor(config_path):
+    """Returns the cached WorkdayProcessor for the current version of 'config_path'."""
+    config_path = os.path.abspath(config_path)
+    return _make_processor(config_path, os.stat(config_path).st_mtime)
 
-    # Step 3: Load browsers dataset for unique apps
-    browsers = processor.load_csv(processor.config['paths']['browsers'], sep=';')
-
-    # Step 4: Prepare initial data (refine timestamps, handle inactive apps, and private links)
-    prepared_df = processor.prepare_initial_data(raw_df, browsers)
+if __name__ == "__main__":
 
-    # Step 5: Preprocess data (apply mappings, clean columns, and merge rows)
-    df_processed = processor.preprocess_data(prepared_df)
+    # List the mounted directories only when debugging the container setup
+    if os.environ.get("PIPELINE_DEBUG") == "1":
+        for path in ('/', '/data/', '/exp/', '/out/'):
+            try:
+                with os.scandir(path) as entries:
+                    print(path, [entry.name for entry in entries])
+            except OSError as e:
+                print(e)
+
+    parser = argparse.ArgumentParser(description="Turn the raw activity dataset into processed workdays.")
+    parser.add_argument(
+        '--config',
+        default=str(DEFAULT_CONFIG_PATH),
+        help="Path to the processing config file (default: configs/processing_config.yaml)"
+    )
+    config_path = parser.parse_args().config
 
-    # Step 6: Create working days (split data into workday chunks)
-    working_day_df = processor.create_working_day(df_processed, max_workday_gap=timedelta(hours=1))
+    print(f"Current config path: {config_path}")
 
-    # Step 7: Merge 'Log Lost/Software Bug' entries and consecutive same apps
-    working_day_df = processor.merge_log_lost_and_same_apps(working_day_df)
+    if not os.path.isfile(config_path):
+        raise FileNotFoundError(f"Config file does not exist: {config_path}")
 
-    # Step 8: Delete working days in the specified date range
-    filtered_df = processor.delete_working_days(working_day_df)
+    # Imported here so that --help and a missing config do not pay for the pandas import
+    import pandas as pd
+    from run import run_pipeline
 
-    # Step 9: Add additional workday features
-    enriched_df = processor.add_workday_features(filtered_df)
+    # Let the pipeline steps share column buffers and only copy the columns they modify
+    pd.set_option("mode.copy_on_write", True)
 
-    # Step 10: Process workdays (final adjustments, merging, and filtering)
-    final_df = processor.process_workdays(enriched_df)
+    # Step 1: Load configuration
+    processor = get_processor(config_path)
 
-    # Step 11: Save the final processed DataFrame
-    save_path = processor.config['paths']['processed_data']
-    processor.save_processed_data(final_df, save_path)
+    # Steps 2-11: Load, process and save the data
+    run_pipeline(processor)
@@ -1,11 +1,52 @@
 
+import copy
+import functools
 import os
+import numpy as np
 import pandas as pd
-import yaml
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from pathlib import Path
 import json
 from datetime import timedelta
+from itertools import chain
 from utils import append_local_to_apps, drop_na_sites
+from yaml_cache import load_yaml
+
+# Python's re '\s' (str.isspace characters) spelled out for RE2, whose '\s' is ASCII-only
+_WHITESPACE_RUN = r'[\t\n\v\f\r\x1c-\x1f\x85\p{Z}]+'
+
+# Labels of the gap before a row inside a workday (see WorkdayProcessor._assign_workdays)
+_NO_GAP, _GAP_LOG_LOST, _GAP_PAUSE = 0, 1, 2
+
+
+def _read_csv_table(file_path, sep, dtype_items):
+    """Parse a CSV file into an Arrow table; 'dtype_items' are (column, Arrow type name) pairs."""
+    column_types = {col: pa.type_for_alias(type_name) for col, type_name in dtype_items}
+    # Memory-map the file so the parser reads the page cache directly instead of copying through a file buffer
+    with pa.memory_map(str(file_path)) as source:
+        return pacsv.read_csv(
+            source,
+            read_options=pacsv.ReadOptions(use_threads=True, block_size=64 << 20),
+            parse_options=pacsv.ParseOptions(delimiter=sep),
+            # Treat empty strings as missing values, as pandas does
+            convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+        )
+
+
+@functools.lru_cache(maxsize=16)
+def _read_csv_table_cached(file_path, mtime, size, sep, dtype_items):
+    """_read_csv_table memoized on the file's path, mtime and size."""
+    return _read_csv_table(file_path, sep, dtype_items)
+
+
+@functools.lru_cache(maxsize=16)
+def _read_json_cached(file_path, mtime, size):
+    """Parse a JSON file, memoized on the file's path, mtime and size."""
+    # json.loads decodes UTF-8 bytes itself, which skips the text-mode file wrapper
+    return json.loads(Path(file_path).read_bytes())
 
 
 class WorkdayProcessor:
@@ -14,19 +55,75 @@ class WorkdayProcessor:
 
     @staticmethod
     def load_config(config_path):
-        """Load configuration from a YAML file."""
-        with open(config_path, 'r', encoding='utf-8') as fp:
-            return yaml.safe_load(fp)
+        """Load configuration from a YAML file (cached while the file is unchanged)."""
+        return load_yaml(config_path)
 
-    def load_csv(self, file_path, sep=','):
-        """Load a CSV file into a DataFrame."""
-        with open(file_path, 'r', encoding='utf-8') as fp:
-            return pd.read_csv(fp, sep=sep)
+    def load_csv(self, file_path, sep=',', chunksize=None, dtype=None, cache=False):
+        """
+        Load a CSV file into a DataFrame using Arrow's multithreaded CSV reader.
+        If 'chunksize' is given, returns an iterator of DataFrames with at most that many rows each;
+        the parsed Arrow table is kept and only one chunk at a time is converted to pandas.
+        'dtype' maps column names to Arrow type names (e.g. 'string', 'int64', 'bool') and
+        skips type inference for those columns.
+        With 'cache=True' the parsed table is reused while the file is unchanged; meant for
+        small lookup files such as the mappings, not for the raw dataset.
+        """
+        dtype_items = tuple(sorted((dtype or {}).items()))
+        if cache:
+            st = os.stat(file_path)
+            table = _read_csv_table_cached(os.path.abspath(file_path), st.st_mtime, st.st_size, sep, dtype_items)
+            # Arrow tables are immutable, so every caller gets its own DataFrame from the shared table
+            return table.to_pandas(split_blocks=True)
+
+        table = _read_csv_table(file_path, sep, dtype_items)
+        if chunksize is None:
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        return (
+            table.slice(offset, chunksize).to_pandas(split_blocks=True)
+            for offset in range(0, table.num_rows, chunksize)
+        )
+
+    def load_csv_cached(self, file_path, sep=',', dtype=None):
+        """
+        Load a small, rarely changing CSV file through a Parquet copy stored next to it.
+        The Parquet copy is used while it is newer than the CSV, and rewritten otherwise.
+        If the copy cannot be written (e.g. read-only mount), the CSV is simply parsed every time.
+        """
+        csv_path = Path(file_path)
+        parquet_path = csv_path.with_suffix('.parquet')
+        try:
+            if parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+                return self.load_parquet(parquet_path)
+        except OSError:
+            pass
+
+        df = self.load_csv(file_path, sep=sep, dtype=dtype)
+        try:
+            # Write to a temporary file first so a concurrent run never reads a partial copy
+            tmp_path = parquet_path.with_name(f'.{parquet_path.name}.{os.getpid()}.tmp')
+            df.to_parquet(tmp_path, engine='pyarrow', index=False)
+            os.replace(tmp_path, parquet_path)
+        except OSError:
+            pass
+        return df
+
+    def load_parquet(self, file_path, chunksize=None):
+        """
+        Load a Parquet file into a DataFrame.
+        If 'chunksize' is given, returns an iterator of DataFrames with at most that many rows each.
+        """
+        if chunksize is None:
+            return pq.read_table(file_path).to_pandas(split_blocks=True, self_destruct=True)
+        parquet_file = pq.ParquetFile(file_path)
+        return (
+            pa.Table.from_batches([batch]).to_pandas(split_blocks=True)
+            for batch in parquet_file.iter_batches(batch_size=chunksize)
+        )
 
     def load_json(self, file_path):
-        """Load a JSON file."""
-        with open(file_path, 'r', encoding='utf-8') as fp:
-            return json.load(fp)
+        """Load a JSON file (parsed once while the file is unchanged; a copy is returned)."""
+        st = os.stat(file_path)
+        return copy.deepcopy(_read_json_cached(os.path.abspath(file_path), st.st_mtime, st.st_size))
 
     @staticmethod
     def prepare_initial_data(df, browsers):
@@ -44,14 +141,19 @@ class WorkdayProcessor:
         # Convert 'start' and 'end' to datetime
         df['start_time'] = pd.to_datetime(df['start'], unit='ms')
         df['end_time'] = pd.to_datetime(df['end'], unit='ms')
-        df = df.sort_values(by=['employeeId', 'start_time'])
+        # No sort here: merge_consecutive_rows sorts the combined frame by the same keys (stably)
 
         # Filling NaN values in the DataFrame for specific columns
-        df['mouseClicks'].fillna(0, inplace=True)
-        df['keystrokes'].fillna(0, inplace=True)
-        df['mouseScroll'].fillna(0, inplace=True)
-        df['mic'].fillna(False, inplace=True)
-        df['camera'].fillna(False, inplace=True)
+        df = df.fillna({'mouseClicks': 0, 'keystrokes': 0, 'mouseScroll': 0})
+        # mic/camera may arrive as object (Arrow bool with nulls); go through the nullable boolean dtype
+        df = df.astype({'mic': 'boolean', 'camera': 'boolean'}).fillna({'mic': False, 'camera': False})
+        df = df.astype({'mic': bool, 'camera': bool})
+
+        # Counters fit in int32; halves their memory through the sort and merge steps.
+        # Columns that held missing values are float and are left as they are.
+        for col in ('mouseClicks', 'keystrokes'):
+            if pd.api.types.is_integer_dtype(df[col]):
+                df[col] = df[col].astype('int32')
 
         # Rewrite 'app' as 'Private Links' where 'app' is in unique_apps and 'site' is NaN
         df.loc[df['app'].isin(unique_apps) & df['site'].isna(), 'app'] = 'Private Links'
@@ -72,333 +174,346 @@ class WorkdayProcessor:
     def preprocess_data(self, df):
         """Main method to process datasets."""
         paths = self.config['paths']
+        dtypes = self.config.get('dtypes', {})
 
         # Load mappings
-        mappings_apps = self.load_csv(paths['app_mappings'])
-        mappings_sites = self.load_csv(paths['site_mappings'])
+        mappings_apps = self.load_csv(paths['app_mappings'], dtype=dtypes.get('app_mappings'), cache=True)
+        mappings_sites = self.load_csv(paths['site_mappings'], dtype=dtypes.get('site_mappings'), cache=True)
         exclude_mappings = self.load_json(paths['exclude_mappings'])
 
         # Apply utility functions
         mappings_apps = append_local_to_apps(mappings_apps)
         mappings_sites = drop_na_sites(mappings_sites)
 
-        # Step 1: Map excluded sites to themselves in mappings_sites
-        mappings_sites.loc[mappings_sites['site'].isin(exclude_mappings['sites']), 'site_mapping'] = mappings_sites['site']
-        df = df.merge(mappings_sites[['site', 'site_mapping']], on='site', how='left')
-        df['app'] = df['site_mapping'].combine_first(df['app'])
-        df.drop(columns=['site_mapping'], inplace=True)
-
-        # Step 2: Map excluded apps to themselves in mappings_apps
-        mappings_apps.loc[mappings_apps['app'].isin(exclude_mappings['apps']), 'app_mapping_v2'] = mappings_apps['app']
-        df = df.merge(mappings_apps[['app', 'app_mapping_v2']], on='app', how='left')
-        df['app'] = df['app_mapping_v2'].combine_first(df['app'])
-        df.drop(columns=['app_mapping_v2'], inplace=True)
-
-        df['app'] = df['app'].str.replace(r'\s+', '_', regex=True)
+        # Low-cardinality string keys as categoricals, so sorting, grouping and merging work on integer codes
+        df['employeeId'] = df['employeeId'].astype('category')
+        df['site'] = df['site'].astype('category')
+
+        # Step 1: Map sites to apps; excluded sites map to themselves
+        site_map = self._mapping_dict(mappings_sites, 'site', 'site_mapping', exclude_mappings['sites'])
+        # On the categorical 'site' this looks up each distinct site once
+        df['app'] = df['site'].map(site_map).astype(object).fillna(df['app'])
+
+        # Step 2: Map apps to their app group; excluded apps map to themselves
+        app_map = self._mapping_dict(mappings_apps, 'app', 'app_mapping_v2', exclude_mappings['apps'])
+        df['app'] = df['app'].map(app_map).fillna(df['app'])
+
+        # Collapse whitespace runs to '_' once per distinct app name instead of once per row.
+        # App names repeat heavily, so the result is kept as a categorical (integer codes for comparisons).
+        codes, uniques = pd.factorize(df['app'])
+        uniques = pc.replace_substring_regex(
+            pa.array(uniques, type=pa.string()), pattern=_WHITESPACE_RUN, replacement='_'
+        ).to_numpy(zero_copy_only=False)
+        # Different names can collapse to the same one, so factorize again; -1 (missing) stays -1
+        new_codes, categories = pd.factorize(uniques)
+        df['app'] = pd.Categorical.from_codes(np.append(new_codes, -1)[codes], categories=categories)
 
         # Step 4: Merge consecutive app usage rows
         df = self.merge_consecutive_rows(df)
 
         return df
 
+    @staticmethod
+    def _mapping_dict(mappings, key, value, excluded):
+        """
+        Builds a {key: value} lookup from a mapping table, with the keys listed in 'excluded' mapped
+        to themselves. Raises ValueError if a key appears more than once, since it is then
+        ambiguous which mapping applies.
+        """
+        duplicated = mappings[key].duplicated(keep=False)
+        if duplicated.any():
+            raise ValueError(f"Duplicate '{key}' keys in mapping: {list(mappings.loc[duplicated, key].unique())}")
+        mapping = dict(zip(mappings[key], mappings[value]))
+        for name in excluded:
+            if name in mapping:
+                mapping[name] = name
+        return mapping
+
     @staticmethod
     def merge_consecutive_rows(df):
         """Merge consecutive rows with the same app and employeeId."""
-        df = df.sort_values(by=['employeeId', 'start_time']).reset_index(drop=True)
-        df['new_group'] = (
+        df = df[df['employeeId'].notna()].sort_values(by=['employeeId', 'start_time']).reset_index(drop=True)
+        new_group = (
             (df['employeeId'] != df['employeeId'].shift()) |
             (df['app'] != df['app'].shift()) |
             (df['start_time'] != df['end_time'].shift())
-        )
-        df['group_id'] = df['new_group'].cumsum()
-        df = df.groupby(['employeeId', 'group_id'], as_index=False).agg({
-            'start_time': 'first',
-            'end_time': 'last',
-            'app': 'first',
-            'mouseClicks': 'sum',
-            'keystrokes': 'sum',
-            'mic': 'max',  # OR operation equivalent for boolean values
-            'mouseScroll': 'sum',
-            'camera': 'max'  # OR operation equivalent for boolean values
+        ).to_numpy()
+
+        # The rows are sorted, so every group is a contiguous run: reduce each run between its boundaries
+        run_starts = np.flatnonzero(new_group)
+        run_ends = np.append(run_starts, len(df))[1:] - 1
+
+        def run_sum(col):
+            values = df[col].to_numpy()
+            if not len(run_starts):
+                return values[:0]
+            # Accumulate in a wider type (extended precision for floats, like groupby's compensated sum),
+            # then return to the column's dtype
+            wide = np.longdouble if values.dtype.kind == 'f' else np.int64
+            return np.add.reduceat(values.astype(wide), run_starts).astype(values.dtype)
+
+        def run_any(col):
+            values = df[col].to_numpy(dtype=bool)
+            return np.logical_or.reduceat(values, run_starts) if len(run_starts) else values[:0]
+
+        return pd.DataFrame({
+            'employeeId': df['employeeId'].take(run_starts).reset_index(drop=True),
+            'start_time': df['start_time'].to_numpy()[run_starts],
+            'end_time': df['end_time'].to_numpy()[run_ends],
+            'app': df['app'].take(run_starts).reset_index(drop=True),
+            'mouseClicks': run_sum('mouseClicks'),
+            'keystrokes': run_sum('keystrokes'),
+            'mic': run_any('mic'),  # OR operation equivalent for boolean values
+            'mouseScroll': run_sum('mouseScroll'),
+            'camera': run_any('camera'),  # OR operation equivalent for boolean values
         })
-        df = df.drop(columns=['group_id']).sort_values(by=['employeeId', 'start_time']).reset_index(drop=True)
-        return df
 
     @staticmethod
     def create_working_day(df, max_workday_gap=timedelta(hours=2)):
-        result = []
-        
-        for employee_id, group in df.groupby('employeeId'):
-            # Sort the group by 'start_time' to process logs in chronological order
-            group = group.sort_values('start_time').reset_index(drop=True)
-            
-            daily_apps = []
-            daily_durations = []
-            daily_app_start_times = []
-            daily_app_end_times = []
-            daily_mouse_clicks = []
-            daily_keystrokes = []
-            daily_mic = []
-            daily_mouse_scroll = []
-            daily_camera = []
-            day_counter = 1
-            last_end = None
-            start_time_of_workday = None
-
-            for idx, row in group.iterrows():
-                app_name = row['app']
-                start_time = row['start_time']
-                end_time = row['end_time']
-                mouse_clicks = row['mouseClicks']
-                keystrokes = row['keystrokes']
-                mic = row['mic']
-                mouse_scroll = row['mouseScroll']
-                camera = row['camera']
-
-                if last_end is None:
-                    # Initialize start_time_of_workday and last_end
-                    start_time_of_workday = start_time
-                    last_end = end_time
-
-                    daily_apps.append(app_name)
-                    daily_durations.append((end_time - start_time).total_seconds() / 60)
-                    daily_app_start_times.append(start_time)
-                    daily_app_end_times.append(end_time)
-                    daily_mouse_clicks.append(mouse_clicks)
-                    daily_keystrokes.append(keystrokes)
-                    daily_mic.append(mic)
-                    daily_mouse_scroll.append(mouse_scroll)
-                    daily_camera.append(camera)
-                    continue
-
-                gap = start_time - last_end
-
-                # If the gap is larger than or equal to max_workday_gap, start a new workday
-                if gap >= max_workday_gap:
-                    # Append the current workday to result
-                    result.append({
-                        'employeeId': f'{employee_id}_{day_counter}',
-                        'app': daily_apps,
-                        'app_durations': daily_durations,
-                        'app_start_times': daily_app_start_times,
-                        'app_end_times': daily_app_end_times,
-                        'mouseClicks': daily_mouse_clicks,
-                        'keystrokes': daily_keystrokes,
-                        'mic': daily_mic,
-                        'mouseScroll': daily_mouse_scroll,
-                        'camera': daily_camera,
-                        'start_time': start_time_of_workday,
-                        'end_time': last_end
-                    })
-                    
-                    day_counter += 1
-                    daily_apps = []
-                    daily_durations = []
-                    daily_app_start_times = []
-                    daily_app_end_times = []
-                    daily_mouse_clicks = []
-                    daily_keystrokes = []
-                    daily_mic = []
-                    daily_mouse_scroll = []
-                    daily_camera = []
-                    start_time_of_workday = start_time
-                    last_end = end_time
-
-                    # Start the new workday with the current app
-                    daily_apps.append(app_name)
-                    daily_durations.append((end_time - start_time).total_seconds() / 60)
-                    daily_app_start_times.append(start_time)
-                    daily_app_end_times.append(end_time)
-                    daily_mouse_clicks.append(mouse_clicks)
-                    daily_keystrokes.append(keystrokes)
-                    daily_mic.append(mic)
-                    daily_mouse_scroll.append(mouse_scroll)
-                    daily_camera.append(camera)
-                    continue
-
-                # If the gap is 20 seconds or less, label as "Log Lost/Software Bug"
-                if timedelta(seconds=0) < gap <= timedelta(seconds=20):
-                    daily_apps.append('Log Lost/Software Bug')
-                    daily_durations.append(gap.total_seconds() / 60)
-                    daily_app_start_times.append(last_end)
-                    daily_app_end_times.append(start_time)
-                    daily_mouse_clicks.append(0)
-                    daily_keystrokes.append(0)
-                    daily_mic.append(False)
-                    daily_mouse_scroll.append(0)
-                    daily_camera.append(False)
-                
-                # If the gap is larger than 20 seconds and less than max_workday_gap, label as "Pause"
-                elif timedelta(seconds=20) < gap < max_workday_gap:
-                    daily_apps.append('Pause')
-                    daily_durations.append(gap.total_seconds() / 60)
-                    daily_app_start_times.append(last_end)
-                    daily_app_end_times.append(start_time)
-                    daily_mouse_clicks.append(0)
-                    daily_keystrokes.append(0)
-                    daily_mic.append(False)
-                    daily_mouse_scroll.append(0)
-                    daily_camera.append(False)
-
-                # Add the current app duration
-                daily_apps.append(app_name)
-                daily_durations.append((end_time - start_time).total_seconds() / 60)
-                daily_app_start_times.append(start_time)
-                daily_app_end_times.append(end_time)
-                daily_mouse_clicks.append(mouse_clicks)
-                daily_keystrokes.append(keystrokes)
-                daily_mic.append(mic)
-                daily_mouse_scroll.append(mouse_scroll)
-                daily_camera.append(camera)
-
-                # Update last_end to the current app's end time
-                last_end = end_time
-
-            # Append any remaining apps and durations for the final day
-            if daily_apps:
-                result.append({
-                    'employeeId': f'{employee_id}_{day_counter}',
-                    'app': daily_apps,
-                    'app_durations': daily_durations,
-                    'app_start_times': daily_app_start_times,
-                    'app_end_times': daily_app_end_times,
-                    'mouseClicks': daily_mouse_clicks,
-                    'keystrokes': daily_keystrokes,
-                    'mic': daily_mic,
-                    'mouseScroll': daily_mouse_scroll,
-                    'camera': daily_camera,
-                    'start_time': start_time_of_workday,
-                    'end_time': last_end
-                })
-
-        # Create a DataFrame from the result list
-        result_df = pd.DataFrame(result)
-        
-        return result_df
-    
+        """
+        Splits the rows of each employee into workdays (a gap of at least 'max_workday_gap' starts
+        a new one) and returns one row per workday with list columns. Gaps inside a workday become
+        'Log Lost/Software Bug' (up to 20 seconds) or 'Pause' entries.
+        """
+        entries, day_starts, day_ids = WorkdayProcessor._workday_entries(df, max_workday_gap)
+        return WorkdayProcessor._workdays_frame(entries, day_starts, day_ids)
+
     @staticmethod
     def merge_log_lost_and_same_apps(df):
         """
         Processes the DataFrame to handle 'Log Lost/Software Bug' entries and merge consecutive same apps.
         """
-        processed_rows = []
-        
-        for idx, row in df.iterrows():
-            apps = row['app']
-            durations = row['app_durations']
-            app_starts = row['app_start_times']
-            app_ends = row['app_end_times']
-            mouse_clicks = row['mouseClicks']
-            keystrokes = row['keystrokes']
-            mic = row['mic']
-            mouse_scroll = row['mouseScroll']
-            camera = row['camera']
-            employeeId = row['employeeId']
-            day_start = row['start_time']
-            day_end = row['end_time']
-            
-            # Initialize lists for processed data
-            new_apps = []
-            new_durations = []
-            new_app_starts = []
-            new_app_ends = []
-            new_mouse_clicks = []
-            new_keystrokes = []
-            new_mic = []
-            new_mouse_scroll = []
-            new_camera = []
-            
-            i = 0
-            while i < len(apps):
-                app_name = apps[i]
-                duration = durations[i]
-                start_time = app_starts[i]
-                end_time = app_ends[i]
-                clicks = mouse_clicks[i]
-                keys = keystrokes[i]
-                mic_active = mic[i]
-                scroll = mouse_scroll[i]
-                cam_active = camera[i]
-                
-                # If the app is 'Log Lost/Software Bug'
-                if app_name == 'Log Lost/Software Bug':
-                    # Merge with previous app
-                    if len(new_apps) > 0:
-                        # Extend the previous app's end time and duration
-                        new_durations[-1] += duration
-                        new_app_ends[-1] = end_time
-                        new_mouse_clicks[-1] += clicks
-                        new_keystrokes[-1] += keys
-                        new_mic[-1] = new_mic[-1] or mic_active
-                        new_mouse_scroll[-1] += scroll
-                        new_camera[-1] = new_camera[-1] or cam_active
-                    i += 1
-                    continue
-                
-                # If current app is same as previous and end time of previous is same as start time
-                if (len(new_apps) > 0 and
-                    app_name == new_apps[-1] and
-                    new_app_ends[-1] == start_time):
-                    # Merge with previous app
-                    new_durations[-1] += duration
-                    new_app_ends[-1] = end_time
-                    new_mouse_clicks[-1] += clicks
-                    new_keystrokes[-1] += keys
-                    new_mic[-1] = new_mic[-1] or mic_active
-                    new_mouse_scroll[-1] += scroll
-                    new_camera[-1] = new_camera[-1] or cam_active
-                else:
-                    # Add new app
-                    new_apps.append(app_name)
-                    new_durations.append(duration)
-                    new_app_starts.append(start_time)
-                    new_app_ends.append(end_time)
-                    new_mouse_clicks.append(clicks)
-                    new_keystrokes.append(keys)
-                    new_mic.append(mic_active)
-                    new_mouse_scroll.append(scroll)
-                    new_camera.append(cam_active)
-                i += 1
-            
-            # Create a new row with the processed data
-            new_row = {
-                'employeeId': employeeId,
-                'app': new_apps,
-                'app_durations': new_durations,
-                'app_start_times': new_app_starts,
-                'app_end_times': new_app_ends,
-                'mouseClicks': new_mouse_clicks,
-                'keystrokes': new_keystrokes,
-                'mic': new_mic,
-                'mouseScroll': new_mouse_scroll,
-                'camera': new_camera,
-                'start_time': day_start,
-                'end_time': day_end
-            }
-            processed_rows.append(new_row)
-        
-        # Create a new DataFrame
-        return pd.DataFrame(processed_rows)
+        list_columns = ['app', 'app_durations', 'app_start_times', 'app_end_times',
+                        'mouseClicks', 'keystrokes', 'mic', 'mouseScroll', 'camera']
+
+        # Flatten the list columns of all workdays into one array per column
+        lengths = np.fromiter(map(len, df['app']), dtype=np.int64, count=len(df))
+        day_starts = np.cumsum(lengths) - lengths
+        entries = {}
+        for col in list_columns:
+            flat = list(chain.from_iterable(df[col]))
+            if col in ('app_start_times', 'app_end_times'):
+                entries[col] = pd.DatetimeIndex(flat).to_numpy()
+            elif col in ('mic', 'camera'):
+                entries[col] = np.array(flat, dtype=bool)
+            else:
+                entries[col] = np.array(flat, dtype=object)
+
+        # 'Log Lost/Software Bug' entries before the first app of a workday have nothing to merge into
+        positions = np.arange(len(entries['app']))
+        is_log_lost = entries['app'] == 'Log Lost/Software Bug'
+        last_app = np.maximum.accumulate(np.where(is_log_lost, -1, positions)) if len(positions) else positions
+        kept = np.flatnonzero(last_app >= np.repeat(day_starts, lengths))
+        entries = {col: values[kept] for col, values in entries.items()}
+
+        entries, day_starts = WorkdayProcessor._merge_entries(entries, np.searchsorted(kept, day_starts))
+
+        result = {'employeeId': df['employeeId'].tolist()}
+        result.update(WorkdayProcessor._entry_lists(entries, day_starts))
+        result['start_time'] = df['start_time'].tolist()
+        result['end_time'] = df['end_time'].tolist()
+        return pd.DataFrame(result, columns=['employeeId', *list_columns, 'start_time', 'end_time'])
+
+    @staticmethod
+    def create_working_day_and_merge(df, max_workday_gap=timedelta(hours=2)):
+        """
+        Single-pass equivalent of create_working_day followed by merge_log_lost_and_same_apps.
+        Workday ids and same-app run ids are computed vectorized over the whole DataFrame,
+        so each workday's lists are built once, already merged.
+        """
+        entries, day_starts, day_ids = WorkdayProcessor._workday_entries(df, max_workday_gap)
+        entries, day_starts = WorkdayProcessor._merge_entries(entries, day_starts)
+        return WorkdayProcessor._workdays_frame(entries, day_starts, day_ids)
+
+    @staticmethod
+    def _workday_entries(df, max_workday_gap):
+        """
+        Splits the rows of each employee into workdays and adds the 'Log Lost/Software Bug'
+        and 'Pause' entries for the gaps inside a workday, as create_working_day does.
+        Returns:
+        - entries: dict of flat NumPy arrays (one per list column) in chronological order.
+        - day_starts: position in those arrays where each workday begins.
+        - day_ids: 'employeeId_dayNumber' label of each workday.
+        """
+        df = df[df['employeeId'].notna()].sort_values(by=['employeeId', 'start_time'], kind='stable')
+        employee_ids = df['employeeId'].to_numpy()
+        starts = df['start_time'].to_numpy(dtype='datetime64[ns]')
+        ends = df['end_time'].to_numpy(dtype='datetime64[ns]')
+        n_rows = len(df)
+        positions = np.arange(n_rows)
+
+        first_of_employee = np.ones(n_rows, dtype=bool)
+        first_of_employee[1:] = employee_ids[1:] != employee_ids[:-1]
+        gap_ns = pd.Timedelta(max_workday_gap).value
+        new_day, gaps, day_numbers, gap_labels = WorkdayProcessor._assign_workdays(
+            first_of_employee, starts.view('int64'), ends.view('int64'), gap_ns
+        )
+        day_ids = [f'{employee_id}_{day}' for employee_id, day in zip(employee_ids[new_day], day_numbers[new_day])]
+        prev_ends = np.empty_like(ends)
+        prev_ends[1:] = ends[:-1]
+
+        # A positive gap inside a workday gets a synthetic entry right before the row
+        has_gap = gap_labels != _NO_GAP
+        log_lost = gap_labels[has_gap] == _GAP_LOG_LOST
+        row_pos = positions + np.cumsum(has_gap)
+        gap_pos = row_pos[has_gap] - 1
+        n_entries = n_rows + len(gap_pos)
+
+        def interleave(row_values, gap_values, dtype=object):
+            out = np.empty(n_entries, dtype=dtype)
+            out[row_pos] = row_values
+            out[gap_pos] = gap_values
+            return out
+
+        durations = ((df['end_time'] - df['start_time']).dt.total_seconds() / 60).to_numpy(dtype=object)
+        gap_durations = (pd.to_timedelta(gaps[has_gap]).total_seconds() / 60).to_numpy(dtype=object)
+        entries = {
+            'app': interleave(df['app'].to_numpy(dtype=object), np.where(log_lost, 'Log Lost/Software Bug', 'Pause')),
+            'app_durations': interleave(durations, gap_durations),
+            'app_start_times': interleave(starts, prev_ends[has_gap], dtype='datetime64[ns]'),
+            'app_end_times': interleave(ends, starts[has_gap], dtype='datetime64[ns]'),
+            'mouseClicks': interleave(df['mouseClicks'].to_numpy(dtype=object), 0),
+            'keystrokes': interleave(df['keystrokes'].to_numpy(dtype=object), 0),
+            'mic': interleave(df['mic'].to_numpy(dtype=bool), False, dtype=bool),
+            'mouseScroll': interleave(df['mouseScroll'].to_numpy(dtype=object), 0),
+            'camera': interleave(df['camera'].to_numpy(dtype=bool), False, dtype=bool),
+        }
+        return entries, row_pos[new_day], day_ids
+
+    @staticmethod
+    def _assign_workdays(first_of_employee, starts_ns, ends_ns, gap_ns):
+        """
+        Workday split kernel over int64 nanosecond timestamps, sorted by employee and start time.
+        A row starts a new workday if it is the first row of its employee or if the gap since the
+        previous row's end is at least 'gap_ns'.
+        Returns the new-workday mask, the gap to the previous row (in ns), the 1-based
+        workday number of each row within its employee (int32) and an int8 label per row for
+        the gap before it: _NO_GAP, _GAP_LOG_LOST (up to 20 seconds) or _GAP_PAUSE.
+        """
+        gaps = np.empty_like(starts_ns)
+        gaps[0:1] = 0
+        gaps[1:] = starts_ns[1:] - ends_ns[:-1]
+        new_day = first_of_employee | (gaps >= gap_ns)
 
+        # Day counter per employee: global workday index minus the index at the employee's first row
+        day_index = np.cumsum(new_day, dtype=np.int32)
+        employee_start = np.maximum.accumulate(np.where(first_of_employee, np.arange(len(gaps)), 0))
+
+        # Only positive gaps inside a workday get a synthetic entry
+        gap_labels = np.where(gaps <= 20 * 10**9, _GAP_LOG_LOST, _GAP_PAUSE).astype(np.int8)
+        gap_labels[new_day | (gaps <= 0)] = _NO_GAP
+        return new_day, gaps, day_index - day_index[employee_start] + 1, gap_labels
 
     @staticmethod
-    def delete_working_days(df):
+    def _merge_entries(entries, day_starts):
         """
-        Removes rows where 'start_time' is between 5th of September 2024 and 13th of September 2024.
+        Applies the merge rules of merge_log_lost_and_same_apps to flat workday entries:
+        'Log Lost/Software Bug' entries are folded into the previous entry, and an entry of the
+        same app that starts exactly where the previous one ended is merged into it.
+        Returns the merged entries and the new workday start positions.
         """
+        apps = entries['app']
+        n_entries = len(apps)
+        if n_entries == 0:
+            return entries, day_starts
+        positions = np.arange(n_entries)
+        is_log_lost = apps == 'Log Lost/Software Bug'
+        # Compare apps by integer code; missing apps get -1 and never match
+        app_codes = pd.factorize(apps)[0]
+
+        # Position of the last non 'Log Lost' entry at or before each entry
+        last_app = np.maximum.accumulate(np.where(is_log_lost, 0, positions))
+        same_app = np.zeros(n_entries, dtype=bool)
+        same_app[1:] = (
+            (app_codes[1:] == app_codes[last_app[:-1]]) & (app_codes[1:] >= 0) &
+            (entries['app_end_times'][:-1] == entries['app_start_times'][1:])
+        )
+        merge = is_log_lost | same_app
+        # Empty workdays start at the end of the entries
+        merge[day_starts[day_starts < n_entries]] = False
+
+        run_starts = np.flatnonzero(~merge)
+        run_ends = np.append(run_starts, n_entries)[1:] - 1
+        merged = {
+            'app': apps[run_starts],
+            'app_durations': np.add.reduceat(entries['app_durations'], run_starts),
+            'app_start_times': entries['app_start_times'][run_starts],
+            'app_end_times': entries['app_end_times'][run_ends],
+            'mouseClicks': np.add.reduceat(entries['mouseClicks'], run_starts),
+            'keystrokes': np.add.reduceat(entries['keystrokes'], run_starts),
+            'mic': np.logical_or.reduceat(entries['mic'], run_starts),
+            'mouseScroll': np.add.reduceat(entries['mouseScroll'], run_starts),
+            'camera': np.logical_or.reduceat(entries['camera'], run_starts),
+        }
+        return merged, np.searchsorted(run_starts, day_starts)
+
+    @staticmethod
+    def _workdays_frame(entries, day_starts, day_ids):
+        """Builds the one-row-per-workday DataFrame with list columns from flat workday entries."""
+        day_ends = np.append(day_starts, len(entries['app']))[1:]
+        result = {'employeeId': day_ids}
+        result.update(WorkdayProcessor._entry_lists(entries, day_starts))
+        result['start_time'] = entries['app_start_times'][day_starts]
+        result['end_time'] = entries['app_end_times'][day_ends - 1]
+        return pd.DataFrame(result)
+
+    @staticmethod
+    def _entry_lists(entries, day_starts):
+        """Splits flat workday entries back into one Python list per workday for each column."""
+        # Plain Python ints as slice bounds; slicing with NumPy integers goes through __index__ on every call
+        bounds = list(zip(day_starts.tolist(), np.append(day_starts, len(entries['app']))[1:].tolist()))
+        lists = {}
+        for col, values in entries.items():
+            if values.dtype.kind == 'M':
+                values = pd.DatetimeIndex(values).to_list()
+            else:
+                values = values.tolist()
+            lists[col] = [values[start:end] for start, end in bounds]
+        return lists
+
+    @staticmethod
+    def _ensure_datetime(df, columns):
+        """Converts the given columns to datetime, skipping the ones that already are."""
+        for col in columns:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], cache=True)
+        return df
+
+    def delete_working_days(self, df):
+        """
+        Removes rows where 'start_time' is between the 'start' and 'end' dates (inclusive)
+        of 'filters.exclude_dates' in the config. Returns the DataFrame unchanged if no range is configured.
+        """
+        exclude_dates = self.config.get('filters', {}).get('exclude_dates')
+        if not exclude_dates:
+            return df
+
         # Ensure 'start_time' is in datetime format
-        df['start_time'] = pd.to_datetime(df['start_time'])
+        df = WorkdayProcessor._ensure_datetime(df, ['start_time'])
 
         # Define the date range
-        start_date = pd.to_datetime('2024-09-05')
-        end_date = pd.to_datetime('2024-09-13')
+        start_date = pd.Timestamp(exclude_dates['start'])
+        end_date = pd.Timestamp(exclude_dates['end'])
 
         # Filter out rows within the specified date range
-        df_filtered = df[~((df['start_time'] >= start_date) & (df['start_time'] <= end_date))]
+        df_filtered = df[~df['start_time'].between(start_date, end_date)]
 
         # Reset index if necessary
         return df_filtered.reset_index(drop=True)
 
+    @staticmethod
+    def _base_employee_id(employee_ids):
+        """
+        Strips the '_<day number>' suffix from workday IDs (e.g. 'emp_1' from 'emp_1_30');
+        IDs without such a suffix are returned unchanged.
+        """
+        parts = employee_ids.str.rsplit('_', n=1, expand=True)
+        if parts.shape[1] < 2:
+            return employee_ids.copy()
+        # isdecimal() is the character class of the regex '\d'
+        has_day_suffix = parts[1].str.isdecimal().eq(True)
+        return parts[0].where(has_day_suffix, employee_ids)
+
     @staticmethod
     def add_workday_features(df):
         """
@@ -407,41 +522,37 @@ class WorkdayProcessor:
         - Hours until the next workday ('hours_until_next_workday').
         - Duration of the workday in minutes ('workday_duration').
         """
+        # Output columns: the input columns plus the new features (the sort key is temporary)
+        output_columns = list(dict.fromkeys([*df.columns, 'hours_until_next_workday', 'workday_duration']))
+
         # Convert 'start_time' and 'end_time' to datetime objects
-        df['start_time'] = pd.to_datetime(df['start_time'])
-        df['end_time'] = pd.to_datetime(df['end_time'])
+        df = WorkdayProcessor._ensure_datetime(df, ['start_time', 'end_time'])
 
         # Extract base employee ID
-        df['base_employeeId'] = df['employeeId'].str.extract(r'^(.*)_\d+$')
-        df['base_employeeId'] = df['base_employeeId'].fillna(df['employeeId'])
+        df['base_employeeId'] = WorkdayProcessor._base_employee_id(df['employeeId'])
 
         # Sort the DataFrame
         df = df.sort_values(by=['base_employeeId', 'start_time']).reset_index(drop=True)
 
-        # Calculate 'next_start_time'
-        df['next_start_time'] = df.groupby('base_employeeId')['start_time'].shift(-1)
-
         # Calculate 'hours_until_next_workday'
-        df['hours_until_next_workday'] = (df['next_start_time'] - df['end_time']).dt.total_seconds() / 3600
-        df['hours_until_next_workday'] = df['hours_until_next_workday'].fillna(-1)
+        next_start_time = df.groupby('base_employeeId', sort=False)['start_time'].shift(-1)
+        df['hours_until_next_workday'] = ((next_start_time - df['end_time']).dt.total_seconds() / 3600).fillna(-1)
 
         # Calculate 'workday_duration' in minutes
         df['workday_duration'] = (df['end_time'] - df['start_time']).dt.total_seconds() / 60
 
-        # Drop temporary columns if not needed
-        df = df.drop(columns=['next_start_time', 'base_employeeId'])
-
-        return df
+        return df[output_columns]
     
     @staticmethod
     def process_workdays(df):
+        # Columns to return; 'base_employeeId' below is only a temporary grouping key
+        output_columns = [col for col in df.columns if col != 'base_employeeId']
+
         # Ensure 'start_time' and 'end_time' are datetime objects
-        df['start_time'] = pd.to_datetime(df['start_time'])
-        df['end_time'] = pd.to_datetime(df['end_time'])
+        df = WorkdayProcessor._ensure_datetime(df, ['start_time', 'end_time'])
 
         # Extract base employee ID (e.g., 'emp_1' from 'emp_1_30')
-        df['base_employeeId'] = df['employeeId'].str.extract(r'^(.*)_\d+$')
-        df['base_employeeId'] = df['base_employeeId'].fillna(df['employeeId'])
+        df['base_employeeId'] = WorkdayProcessor._base_employee_id(df['employeeId'])
 
         # Sort the DataFrame by 'base_employeeId' and 'start_time'
         df = df.sort_values(by=['base_employeeId', 'start_time']).reset_index(drop=True)
@@ -449,157 +560,99 @@ class WorkdayProcessor:
         # Delete all rows where 'workday_duration' < 45 minutes
         df = df[df['workday_duration'] >= 45].reset_index(drop=True)
 
-        # Recalculate 'hours_until_next_workday' after deletion
-        def recalculate_hours_until_next_workday(emp_df):
-            emp_df = emp_df.sort_values('start_time').reset_index(drop=True)
-            emp_df['next_start_time'] = emp_df['start_time'].shift(-1)
-            emp_df['hours_until_next_workday'] = (emp_df['next_start_time'] - emp_df['end_time']).dt.total_seconds() / 3600
-            emp_df['hours_until_next_workday'] = emp_df['hours_until_next_workday'].fillna(-1)
-            return emp_df.drop(columns=['next_start_time'])
-
-        # Reset index to ensure unique indices before grouping
-        df = df.reset_index(drop=True)
-
-        # Add a temporary unique identifier for each row
-        df['unique_id'] = df.index
-
-        # Apply the function and reset the index to avoid duplicate labels
-        df = df.groupby('base_employeeId', group_keys=False).apply(recalculate_hours_until_next_workday).reset_index(drop=True)
-
-        # Now, for each employee, merge adjacent workdays where 'hours_until_next_workday' < 3 hours
-        indices_to_drop = set()
-        for employee_id in df['base_employeeId'].unique():
-            emp_df = df[df['base_employeeId'] == employee_id].sort_values('start_time').reset_index(drop=True)
-            idx = 0
-            while idx < len(emp_df) - 1:
-                current_row = emp_df.loc[idx]
-                next_row = emp_df.loc[idx + 1]
-                current_unique_id = current_row['unique_id']
-                next_unique_id = next_row['unique_id']
-
-                # Calculate actual gap between current end_time and next start_time
-                actual_gap_hours = (next_row['start_time'] - current_row['end_time']).total_seconds() / 3600
-
-                # Continue to merge while actual gap is less than 3 hours
-                if 0 <= actual_gap_hours < 3:
-                    merge_unique_ids = [current_unique_id, next_unique_id]
-                    total_pause_duration = actual_gap_hours * 60  # Convert to minutes
-
-                    # Merge the workdays
-                    first_unique_id = merge_unique_ids[0]
-                    first_row_index = df.index[df['unique_id'] == first_unique_id][0]
-
-                    # Initialize merged lists with the first workday's data
-                    first_row = df.loc[df['unique_id'] == first_unique_id].iloc[0]
-                    merged_app = first_row['app'].copy()
-                    merged_app_durations = first_row['app_durations'].copy()
-                    merged_app_start_times = first_row['app_start_times'].copy()
-                    merged_app_end_times = first_row['app_end_times'].copy()
-                    merged_mouse_clicks = first_row['mouseClicks'].copy()
-                    merged_keystrokes = first_row['keystrokes'].copy()
-                    merged_mic = first_row['mic'].copy()
-                    merged_mouse_scroll = first_row['mouseScroll'].copy()
-                    merged_camera = first_row['camera'].copy()
-
-                    # Loop through the rest of the workdays to merge
-                    for i in range(1, len(merge_unique_ids)):
-                        uid_prev = merge_unique_ids[i - 1]
-                        uid_curr = merge_unique_ids[i]
-
-                        # Insert 'Pause' between workdays
-                        merged_app.append('Pause')
-
-                        # Retrieve times correctly
-                        pause_start_time = df.loc[df['unique_id'] == uid_prev, 'end_time'].iloc[0]
-                        pause_end_time = df.loc[df['unique_id'] == uid_curr, 'start_time'].iloc[0]
-
-                        # Calculate pause duration
-                        pause_duration_minutes = (pause_end_time - pause_start_time).total_seconds() / 60
-                        merged_app_durations.append(pause_duration_minutes)
-                        merged_app_start_times.append(pause_start_time)
-                        merged_app_end_times.append(pause_end_time)
-                        merged_mouse_clicks.append(0)
-                        merged_keystrokes.append(0)
-                        merged_mic.append(False)
-                        merged_mouse_scroll.append(0)
-                        merged_camera.append(False)
-
-                        # Append the lists from the current workday
-                        row_curr = df.loc[df['unique_id'] == uid_curr].iloc[0]
-                        merged_app.extend(row_curr['app'])
-                        merged_app_durations.extend(row_curr['app_durations'])
-                        merged_app_start_times.extend(row_curr['app_start_times'])
-                        merged_app_end_times.extend(row_curr['app_end_times'])
-                        merged_mouse_clicks.extend(row_curr['mouseClicks'])
-                        merged_keystrokes.extend(row_curr['keystrokes'])
-                        merged_mic.extend(row_curr['mic'])
-                        merged_mouse_scroll.extend(row_curr['mouseScroll'])
-                        merged_camera.extend(row_curr['camera'])
-
-                    # Update 'end_time', 'workday_duration', 'hours_until_next_workday'
-                    last_unique_id = merge_unique_ids[-1]
-                    last_row_index = df.index[df['unique_id'] == last_unique_id][0]
-                    df.at[first_row_index, 'end_time'] = df.at[last_row_index, 'end_time']
-                    total_workday_duration = df[df['unique_id'].isin(merge_unique_ids)]['workday_duration'].sum()
-                    total_workday_duration += total_pause_duration
-                    df.at[first_row_index, 'workday_duration'] = total_workday_duration
-                    df.at[first_row_index, 'hours_until_next_workday'] = df.at[last_row_index, 'hours_until_next_workday']
-
-                    # Update the merged lists
-                    df.at[first_row_index, 'app'] = merged_app
-                    df.at[first_row_index, 'app_durations'] = merged_app_durations
-                    df.at[first_row_index, 'app_start_times'] = merged_app_start_times
-                    df.at[first_row_index, 'app_end_times'] = merged_app_end_times
-                    df.at[first_row_index, 'mouseClicks'] = merged_mouse_clicks
-                    df.at[first_row_index, 'keystrokes'] = merged_keystrokes
-                    df.at[first_row_index, 'mic'] = merged_mic
-                    df.at[first_row_index, 'mouseScroll'] = merged_mouse_scroll
-                    df.at[first_row_index, 'camera'] = merged_camera
-
-                    # Mark other workdays for dropping
-                    indices_to_drop.update(merge_unique_ids[1:])
-
-                    # Update emp_df to reflect changes
-                    emp_df.loc[idx, 'end_time'] = df.at[first_row_index, 'end_time']
-                    emp_df.loc[idx, 'workday_duration'] = df.at[first_row_index, 'workday_duration']
-                    emp_df.loc[idx, 'hours_until_next_workday'] = df.at[first_row_index, 'hours_until_next_workday']
-                    emp_df = emp_df.drop(idx + 1).reset_index(drop=True)
-
-                    # Do not increment idx to check for further merges
-                else:
-                    idx += 1  # Move to the next workday
-
-            # Recalculate 'hours_until_next_workday' after merging
-            emp_df = emp_df.sort_values('start_time').reset_index(drop=True)
-            emp_df['next_start_time'] = emp_df['start_time'].shift(-1)
-            emp_df['hours_until_next_workday'] = (emp_df['next_start_time'] - emp_df['end_time']).dt.total_seconds() / 3600
-            emp_df['hours_until_next_workday'] = emp_df['hours_until_next_workday'].fillna(-1)
-
-            # Update the main df with recalculated 'hours_until_next_workday'
-            for idx2, row in emp_df.iterrows():
-                df_index = df.index[df['unique_id'] == row['unique_id']][0]
-                df.at[df_index, 'hours_until_next_workday'] = row['hours_until_next_workday']
-
-        # Drop the rows marked for dropping
-        df = df[~df['unique_id'].isin(indices_to_drop)].reset_index(drop=True)
-
-        # Drop the temporary columns as they're no longer needed
-        df = df.drop(columns=['base_employeeId', 'unique_id'])
-        return df
-    
+        # Recalculate 'hours_until_next_workday' after deletion (df is still sorted by employee and start time)
+        next_start_time = df.groupby('base_employeeId', sort=False)['start_time'].shift(-1)
+        df['hours_until_next_workday'] = ((next_start_time - df['end_time']).dt.total_seconds() / 3600).fillna(-1)
+
+        # Now, for each employee, merge adjacent workdays that start less than 3 hours after the previous one ends.
+        # A merged workday ends where its last part ends, so each block of merged workdays is a run of rows
+        # whose gap to the previous row is in [0, 3) hours.
+        prev_end_time = df.groupby('base_employeeId', sort=False)['end_time'].shift()
+        gap_hours = (df['start_time'] - prev_end_time).dt.total_seconds() / 3600
+        block_starts = np.flatnonzero(~gap_hours.between(0, 3, inclusive='left').to_numpy())
+        block_ends = np.append(block_starts, len(df))[1:]
+
+        list_columns = ['app', 'app_durations', 'app_start_times', 'app_end_times',
+                        'mouseClicks', 'keystrokes', 'mic', 'mouseScroll', 'camera']
+        lists = {col: df[col].tolist() for col in list_columns}
+        start_times = df['start_time'].tolist()
+        end_times = df['end_time'].tolist()
+        workday_durations = df['workday_duration'].tolist()
+        gaps = gap_hours.tolist()
+
+        merged_lists = {col: [lists[col][pos] for pos in block_starts] for col in list_columns}
+        merged_durations = [workday_durations[pos] for pos in block_starts]
+        for block in np.flatnonzero(block_ends - block_starts > 1):
+            first, end = block_starts[block], block_ends[block]
+            positions = range(first + 1, end)
+            # Insert 'Pause' between workdays
+            pauses = [WorkdayProcessor._pause_entry(end_times[pos - 1], start_times[pos]) for pos in positions]
+
+            # Each merged list is materialized once from the source lists, without intermediate copies
+            for col in list_columns:
+                parts = [lists[col][first]]
+                for pause, pos in zip(pauses, positions):
+                    parts.append((pause[col],))
+                    parts.append(lists[col][pos])
+                merged_lists[col][block] = list(chain.from_iterable(parts))
+
+            total_workday_duration = workday_durations[first]
+            for pos in positions:
+                total_workday_duration = total_workday_duration + workday_durations[pos] + gaps[pos] * 60
+            merged_durations[block] = total_workday_duration
+
+        # Keep one row per block, ending where its last workday ends
+        block_end_times = df['end_time'].to_numpy()[block_ends - 1]
+        df = df.iloc[block_starts].reset_index(drop=True)
+        for col in list_columns:
+            df[col] = pd.Series(merged_lists[col], index=df.index, dtype=object)
+        df['end_time'] = block_end_times
+        df['workday_duration'] = merged_durations
+
+        # Recalculate 'hours_until_next_workday' after merging
+        next_start_time = df.groupby('base_employeeId', sort=False)['start_time'].shift(-1)
+        df['hours_until_next_workday'] = ((next_start_time - df['end_time']).dt.total_seconds() / 3600).fillna(-1)
+
+        # Leave out the temporary sort key
+        return df[output_columns]
+
     @staticmethod
-    def save_processed_data(df, save_path):
+    def _pause_entry(pause_start_time, pause_end_time):
+        """List column values of the 'Pause' entry inserted between two merged workdays."""
+        return {
+            'app': 'Pause',
+            'app_durations': (pause_end_time - pause_start_time).total_seconds() / 60,
+            'app_start_times': pause_start_time,
+            'app_end_times': pause_end_time,
+            'mouseClicks': 0,
+            'keystrokes': 0,
+            'mic': False,
+            'mouseScroll': 0,
+            'camera': False,
+        }
+
+    @staticmethod
+    def save_processed_data(df, save_path, file_format=None):
         """
         Saves the processed DataFrame to the specified path.
         Ensures the directory exists and replaces the file if it already exists.
+        'file_format' is 'parquet' or 'csv'; by default paths ending with '.csv' are written as CSV
+        and everything else as zstd-compressed Parquet.
         """
+        if file_format is None:
+            file_format = 'csv' if save_path.endswith('.csv') else 'parquet'
+        if file_format not in ('parquet', 'csv'):
+            raise ValueError(f"Unsupported output format: {file_format!r} (expected 'parquet' or 'csv')")
+
         # Ensure the directory exists
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
         # Save the DataFrame to the specified file
-        df.to_csv(save_path, index=False, encoding='utf-8')
+        if file_format == 'parquet':
+            # Convert the columns in parallel; list columns become native Arrow list arrays
+            # (list<string>, list<double>, list<timestamp>, ...) instead of their repr() strings
+            table = pa.Table.from_pandas(df, preserve_index=False, nthreads=os.cpu_count())
+            pq.write_table(table, save_path, compression='zstd')
+        else:
+            df.to_csv(save_path, index=False, encoding='utf-8')
         print(f"Processed data saved to {save_path}")
-
-
-
-
@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pandas as pd
+
+
+def run_pipeline(processor):
+    """
+    Runs the processing steps for an already configured WorkdayProcessor:
+    loads the inputs named in its config, builds and processes the workdays,
+    and saves the result to 'paths.processed_data'.
+    """
+    # Number of raw rows read and prepared at a time; bounds the memory held by unused raw columns
+    chunksize = int(os.environ.get("PIPELINE_CHUNKSIZE", 1_000_000))
+
+    # Known column types from the config, so the CSV reader can skip type inference
+    dtypes = processor.config.get('dtypes', {})
+
+    # Step 2: Load browsers dataset for unique apps (through its cached Parquet copy).
+    # The Arrow reader releases the GIL, so this read overlaps with the raw dataset below.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        browsers_future = executor.submit(
+            processor.load_csv_cached, processor.config['paths']['browsers'], sep=';', dtype=dtypes.get('browsers')
+        )
+
+        # Step 3: Stream the raw dataset in chunks (Parquet output of main_preprocess.py, or CSV)
+        input_path = processor.config['paths']['input_data']
+        if input_path.endswith('.parquet'):
+            raw_chunks = processor.load_parquet(input_path, chunksize=chunksize)
+        else:
+            raw_chunks = processor.load_csv(input_path, chunksize=chunksize, dtype=dtypes.get('input_data'))
+
+        # Step 4: Prepare initial data (refine timestamps, handle inactive apps, and private links).
+        # Rows are only merged across chunk boundaries in step 5, which re-sorts the combined frame.
+        prepared_df = pd.concat(
+            [processor.prepare_initial_data(chunk, browsers_future.result()) for chunk in raw_chunks]
+        )
+
+    # Step 5: Preprocess data (apply mappings, clean columns, and merge rows)
+    df_processed = processor.preprocess_data(prepared_df)
+
+    # Steps 6 and 7: Create working days (split data into workday chunks), merging
+    # 'Log Lost/Software Bug' entries and consecutive same apps in the same pass
+    working_day_df = processor.create_working_day_and_merge(df_processed, max_workday_gap=timedelta(hours=1))
+
+    # Step 8: Delete working days in the configured date range
+    merged_df = processor.delete_working_days(working_day_df)
+
+    # Step 9: Add additional workday features
+    enriched_df = processor.add_workday_features(merged_df)
+
+    # Step 10: Process workdays (final adjustments, merging, and filtering)
+    final_df = processor.process_workdays(enriched_df)
+
+    # Step 11: Save the final processed DataFrame
+    save_path = processor.config['paths']['processed_data']
+    processor.save_processed_data(final_df, save_path)
@@ -1,63 +1,161 @@
 import os
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Repetitive string columns that are only carried through to the output. They are read dictionary-encoded
+# (integer codes into a small table of distinct values) instead of one string per row.
+_DICTIONARY_STRING = pa.dictionary(pa.int32(), pa.string())
+
+# Column types of the raw CSV exports, so the reader does not have to infer them per file.
+# Per-interval counters and the productivity label are parsed into narrow integers (main_process.py works
+# on int32 counters anyway); 'start' and 'end' are epoch milliseconds and stay int64.
+_RAW_SCHEMA = pa.schema([
+    ("app", pa.string()),
+    ("mouseClicks", pa.int32()),
+    ("os", _DICTIONARY_STRING),
+    ("keystrokes", pa.int32()),
+    ("mic", pa.bool_()),
+    ("start", pa.int64()),
+    ("active", pa.bool_()),
+    ("employeeId", pa.string()),
+    ("appFileName", _DICTIONARY_STRING),
+    ("site", pa.string()),
+    ("redacted_url", pa.string()),
+    ("mouseScroll", pa.float64()),
+    ("productivity", pa.int16()),
+    ("appId", _DICTIONARY_STRING),
+    ("teamId", _DICTIONARY_STRING),
+    ("end", pa.int64()),
+    ("id", pa.string()),
+    ("camera", pa.bool_()),
+    ("categoryId", _DICTIONARY_STRING),
+])
+
+# Files parsed at the same time by load_and_process_csv_files
+_MAX_READ_WORKERS = min(8, os.cpu_count() or 1)
+
+# Empty strings are missing values, as with pandas
+_RAW_CONVERT_OPTIONS = pacsv.ConvertOptions(column_types=_RAW_SCHEMA, strings_can_be_null=True)
+
+# Rows gathered and written at a time when saving the sorted table (one Parquet row group each)
+_WRITE_BATCH_ROWS = 1_000_000
+
+# Strings are quoted and missing values left empty, so an empty field is read back as missing
+_RAW_WRITE_OPTIONS = pacsv.WriteOptions(quoting_style='needed')
 
 def append_local_to_apps(mappings_apps):
-    """Appends '-Local' to the app_mapping_v2 column in mappings_apps."""
-    mappings_apps['app_mapping_v2'] = mappings_apps['app_mapping_v2'] + "-Local"
+    """Appends '-Local' to the app_mapping_v2 column in mappings_apps (missing values stay missing)."""
+    # One Arrow kernel call instead of a Python-level string concatenation per row
+    joined = pc.binary_join_element_wise(
+        pa.array(mappings_apps['app_mapping_v2'], type=pa.string(), from_pandas=True), "-Local", ""
+    )
+    mappings_apps['app_mapping_v2'] = pd.Series(joined.to_numpy(zero_copy_only=False), index=mappings_apps.index)
     return mappings_apps
 
 def drop_na_sites(mappings_sites):
     """Drops rows where 'site' is NaN in mappings_sites."""
-    return mappings_sites.dropna(subset=['site'])
+    valid = mappings_sites['site'].notna().to_numpy()
+    # Nothing to drop: return the frame as is instead of copying it
+    if valid.all():
+        return mappings_sites
+    return mappings_sites.take(np.flatnonzero(valid))
+
+def _encode_employee_ids(table):
+    """Replaces 'employeeId' with a single-chunk dictionary-encoded column (a categorical in pandas)."""
+    encoded = pc.dictionary_encode(table['employeeId'].combine_chunks())
+    return table.set_column(table.schema.get_field_index('employeeId'), 'employeeId', encoded)
+
+def _first_occurrences(table):
+    """
+    Boolean mask of the rows whose 'id' does not appear in an earlier row, i.e. the rows
+    drop_duplicates(subset=['id']) would keep. Rows without an 'id' are all kept.
+    """
+    codes = pc.dictionary_encode(table['id'].combine_chunks()).indices.fill_null(-1).to_numpy()
+    # dictionary_encode numbers the distinct IDs in order of first appearance, so a row is the
+    # first with its ID exactly when its code is greater than every earlier code
+    earlier_max = np.empty_like(codes)
+    earlier_max[:1] = -1
+    np.maximum.accumulate(codes[:-1], out=earlier_max[1:])
+    return (codes > earlier_max) | (codes == -1)
+
+def _employee_sort_order(table, keep):
+    """
+    Row order of a stable sort of the rows of an Arrow table selected by the boolean mask 'keep',
+    by their dictionary-encoded 'employeeId' (missing IDs last), as table.sort_by would give on the
+    strings, but comparing integer ranks: only the distinct IDs are sorted, and the rows are ordered
+    by the rank of their ID. Returns None if all rows are kept and already in that order.
+    """
+    encoded = table['employeeId'].combine_chunks()
+    dictionary = encoded.dictionary
+    rank = np.empty(len(dictionary) + 1, dtype=np.int64)
+    rank[pc.sort_indices(dictionary).to_numpy()] = np.arange(len(dictionary))
+    rank[-1] = len(dictionary)  # missing IDs
+    keys = rank[encoded.indices.fill_null(len(dictionary)).to_numpy()]
+    # Stable sort; NumPy's timsort also runs in about linear time on inputs that are mostly in order
+    if keep.all():
+        if np.all(keys[1:] >= keys[:-1]):
+            return None
+        return np.argsort(keys, kind='stable')
+    rows = np.flatnonzero(keep)
+    return rows[np.argsort(keys[rows], kind='stable')]
+
+def _write_in_order(table, order, output_filepath):
+    """
+    Writes the rows of an Arrow table at the positions in 'order' (or all rows as they are if 'order' is
+    None), gathering _WRITE_BATCH_ROWS rows at a time so the reordered table is never held in memory as a whole.
+    Writes Parquet if the path ends with '.parquet', otherwise CSV.
+    """
+    if output_filepath.endswith('.parquet'):
+        writer = pq.ParquetWriter(output_filepath, table.schema, compression='zstd')
+    else:
+        writer = pacsv.CSVWriter(output_filepath, table.schema, write_options=_RAW_WRITE_OPTIONS)
+    with writer:
+        for start in range(0, len(table) if order is None else len(order), _WRITE_BATCH_ROWS):
+            if order is None:
+                # Already in order: write zero-copy slices
+                writer.write_table(table.slice(start, _WRITE_BATCH_ROWS))
+            else:
+                writer.write_table(table.take(order[start:start + _WRITE_BATCH_ROWS]))
 
 def load_and_process_csv_files(input_directory, output_filepath):
     """
-    Loads all CSV files from the specified directory, concatenates them, drops duplicates,
-    sorts by 'employeeId', and saves the result to the specified output file path.
+    Loads all CSV files from the specified directory, concatenates them, drops duplicate rows
+    (by 'id', keeping the first), sorts by 'employeeId', and saves the result to the specified output file path
+    (as Parquet if the path ends with '.parquet', otherwise as CSV).
 
     Parameters:
     - input_directory: str, the directory containing CSV files to be loaded.
-    - output_filepath: str, the path to save the processed CSV file.
+    - output_filepath: str, the path to save the processed file ('.parquet' or '.csv').
     """
     # List all CSV files in the specified directory
-    csv_files = [f for f in os.listdir(input_directory) if f.endswith('.csv')]
-
-    column_types = {
-        "app": "object",
-        "mouseClicks": "int64",
-        "os": "object",
-        "keystrokes": "int64",
-        "mic": "object",
-        "start": "int64",
-        "active": "bool",
-        "employeeId": "object",
-        "appFileName": "object",
-        "site": "object",
-        "redacted_url": "object",
-        "mouseScroll": "float64",
-        "productivity": "int64",
-        "appId": "object",
-        "teamId": "object",
-        "end": "int64",
-        "id": "object",
-        "camera": "object",
-        "categoryId": "object",
-    }    
-    
-    # Load and concatenate all CSV files
-    dataframes = []
-    for file in csv_files:
-        file_path = os.path.join(input_directory, file)
-        df = pd.read_csv(file_path, dtype=column_types, low_memory=False)
-        dataframes.append(df)
-    
-    combined_df = pd.concat(dataframes, ignore_index=True)
-
-    print(f"Shape of dataframe: {np.shape(combined_df)}")
-
-    # Sort by 'employeeId'
-    combined_df = combined_df.sort_values(by='employeeId').reset_index(drop=True)
-
-    # Save the processed DataFrame to the specified output file path
-    combined_df.to_csv(output_filepath, index=False)
+    with os.scandir(input_directory) as entries:
+        csv_files = [entry.path for entry in entries if entry.name.endswith('.csv') and entry.is_file()]
+
+    # Parse the CSV files concurrently; Arrow's reader releases the GIL, so the threads run in parallel.
+    # Each read is already multithreaded inside Arrow, so a few files at a time saturate the cores;
+    # executor.map keeps the tables in file order.
+    with ThreadPoolExecutor(max_workers=_MAX_READ_WORKERS) as executor:
+        tables = list(executor.map(lambda path: pacsv.read_csv(path, convert_options=_RAW_CONVERT_OPTIONS), csv_files))
+
+    # Concatenate without copying the column data; files missing some columns get nulls, as with pd.concat
+    combined_table = pa.concat_tables(tables, promote_options='default')
+
+    print(f"Shape of dataframe: {combined_table.shape}")
+
+    # Drop rows repeating an earlier row's 'id' (the same record exported more than once), then sort the
+    # remaining rows by 'employeeId'. The IDs are dictionary-encoded first: the sort compares integer codes,
+    # and the column is stored as a dictionary in Parquet, so main_process.py reads it back as a categorical.
+    # The sort is skipped when no rows are dropped and the rows are already in order.
+    combined_table = _encode_employee_ids(combined_table)
+    order = _employee_sort_order(combined_table, _first_occurrences(combined_table))
+
+    # Save the sorted rows to the specified output file path, one batch at a time.
+    # Parquet keeps the column types, so the processing step does not have to re-parse and re-infer them;
+    # in CSV, booleans are written as true/false and whole floats without '.0', which both the pandas
+    # and the Arrow CSV readers parse back to the same values.
+    _write_in_order(combined_table, order, output_filepath)
@@ -0,0 +1,43 @@
+import copy
+import os
+from collections import OrderedDict
+
+import yaml
+
+try:
+    # LibYAML C bindings are much faster than the pure-Python parser
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# Parsed YAML documents keyed by absolute path -> (mtime, size, parsed document)
+_CACHE = OrderedDict()
+_MAX_ENTRIES = 100
+
+
+def load_yaml(path):
+    """
+    Load a YAML file, reusing the parsed document while the file is unchanged.
+
+    The cache entry is validated against the file's mtime and size, so edits to
+    the file are picked up on the next call. A deep copy is returned so callers
+    can mutate the result without corrupting the cache.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (st.st_mtime, st.st_size)
+
+    cached = _CACHE.get(path)
+    if cached is not None and cached[:2] == key:
+        _CACHE.move_to_end(path)
+        return copy.deepcopy(cached[2])
+
+    with open(path, 'r', encoding='utf-8') as fp:
+        data = yaml.load(fp, Loader=_Loader)
+
+    _CACHE[path] = (key[0], key[1], data)
+    _CACHE.move_to_end(path)
+    if len(_CACHE) > _MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+
+    return copy.deepcopy(data)